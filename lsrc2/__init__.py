@@ -34,5 +34,9 @@ __author__ = 'Dimitri Papadopoulos'
 __license__ = 'CeCILL-C'
 __copyright__ = 'Copyright (c) 2016 CEA'
 
-from .session import session, Session
+from .session import session, Session, Participant, close_sessions
 from .exceptions import LimeSurveyError
+
+import importlib.util
+if importlib.util.find_spec('aiohttp') is not None:  # aiohttp is optional
+    from .aio import AsyncSession
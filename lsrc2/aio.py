@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2016-2021 CEA
+#
+# This software is governed by the CeCILL-C license under French law and
+# abiding by the rules of distribution of free software. You can use,
+# modify and/ or redistribute the software under the terms of the CeCILL-C
+# license as circulated by CEA, CNRS and INRIA at the following URL
+# "http://www.cecill.info".
+#
+# As a counterpart to the access to the source code and rights to copy,
+# modify and redistribute granted by the license, users are provided only
+# with a limited warranty and the software's author, the holder of the
+# economic rights, and the successive licensors have only limited
+# liability.
+#
+# In this respect, the user's attention is drawn to the risks associated
+# with loading, using, modifying and/or developing or reproducing the
+# software by the user in light of its specific status of free software,
+# that may mean that it is complicated to manipulate, and that also
+# therefore means that it is reserved for developers and experienced
+# professionals having in-depth computer knowledge. Users are therefore
+# encouraged to load and test the software's suitability as regards their
+# requirements in conditions enabling the security of their systems and/or
+# data to be ensured and, more generally, to use and operate it in the
+# same conditions as regards security.
+#
+# The fact that you are presently reading this means that you have had
+# knowledge of the CeCILL-C license and that you accept its terms.
+
+import itertools
+import logging
+
+import aiohttp
+
+from .session import (_dumps, _loads, _unpack, _session_key, _participants,
+                      _SurveysCache, _RELEASE_TEMPLATE)
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncSession(object):
+    """ Asynchronous session to remote LimeSurvey_ servers.
+
+    Same as :class:`Session`, except that calls are coroutines, so that
+    independent calls can be sent concurrently. Requires aiohttp_.
+
+    Basic Usage::
+
+      >>> import asyncio
+      >>> import lsrc2
+      >>> async def main():
+      >>>     async with lsrc2.AsyncSession('https://lsdemo.limequery.com/admin/remotecontrol', 'limedemo', 'demo') as s:
+      >>>         surveys, error = await s.surveys()
+      >>>         return await asyncio.gather(*(s.participants(survey['sid'])
+      >>>                                       for survey in surveys))
+      >>> results = asyncio.run(main())
+
+    Parameters
+    ----------
+    url : str
+    username : str
+    password : str
+
+    Attributes
+    ----------
+    url : str
+        Base LSRC2 URL.
+    session : aiohttp.ClientSession
+        aiohttp session instance, once opened.
+    key : str
+        LSRC2 session key, once opened.
+
+.. _LimeSurvey: https://www.limesurvey.org
+.. _aiohttp: https://docs.aiohttp.org
+
+    """
+    __attrs__ = ['url', 'session', 'key']
+
+    def __init__(self, url, username, password):
+        self.url = url
+        self.session = None
+        self.key = None
+        # JSON-RPC request ids, specific to this instance
+        self._id_iter = itertools.count(1)
+        self._surveys_cache = _SurveysCache()
+        # credentials are only kept until the session is opened
+        self._credentials = (username, password)
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+        return False  # re-raises the exception
+
+    async def open(self):
+        """Start aiohttp session, then get LimeSurvey session key"""
+        # LSRC2 needs no cookies, the session key is passed along with
+        # each request
+        self.session = aiohttp.ClientSession(
+            headers={'content-type': 'application/json'},
+            cookie_jar=aiohttp.DummyCookieJar())
+        username, password = self._credentials
+        self._credentials = None
+        try:
+            self.key = await self._get_session_key(username, password)
+        except BaseException:
+            await self.session.close()
+            self.session = None
+            raise
+
+    async def close(self):
+        """Release LimeSurvey session key, then close aiohttp session"""
+        if self.session is None:
+            return  # never opened, or already closed
+        try:
+            if self.key is not None:
+                await self._release_session_key(self.key)
+        finally:
+            self.key = None
+            await self.session.close()
+            self.session = None
+
+    def _request(self, method, params):
+        return {
+            'jsonrpc': '2.0',
+            'id': next(self._id_iter),
+            'method': method,
+            'params': params,
+        }
+
+    async def _post(self, request):
+        body = _dumps(request)
+        logger.debug('JSON-RPC request: %s', body)
+        async with self.session.post(self.url, data=body) as response:
+            response = _loads(await response.read())
+        return _unpack(request['id'], response)
+
+    async def _get_session_key(self, username, password):
+        request = self._request('get_session_key', [username, password])
+        response, error = await self._post(request)
+        return _session_key(response, error)
+
+    async def _release_session_key(self, key):
+        logger.info('LSRC2 release session key: %s', key)
+        body = _RELEASE_TEMPLATE % (next(self._id_iter), _dumps(key))
+        # ignore response: ('OK', None) even if bogus key
+        async with self.session.post(self.url, data=body):
+            pass
+
+    async def surveys(self):
+        """Same as :meth:`Session.surveys`"""
+        response = self._surveys_cache.get()
+        if response is None:
+            request = self._request('list_surveys', [self.key])
+            response = self._surveys_cache.update(*await self._post(request))
+        return response
+
+    def invalidate_surveys(self):
+        """Same as :meth:`Session.invalidate_surveys`"""
+        self._surveys_cache.clear()
+
+    async def participants(self, survey, start=0, limit=500, unused=False,
+                           attributes=False):
+        """Same as :meth:`Session.participants`"""
+        request = self._request('list_participants',
+                                [self.key, survey, start, limit, unused, attributes])
+        responses, error = await self._post(request)
+        return _participants(responses, error)
+
+    async def participant_properties(self, survey, participant,
+                                     attributes=None):
+        """Same as :meth:`Session.participant_properties`"""
+        request = self._request('get_participant_properties',
+                                [self.key, survey, participant, attributes])
+        return await self._post(request)
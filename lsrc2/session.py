@@ -27,9 +27,342 @@
 # The fact that you are presently reading this means that you have had
 # knowledge of the CeCILL-C license and that you accept its terms.
 
-import requests
+import itertools
 import json
 import logging
+import threading
+from http.cookiejar import DefaultCookiePolicy
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import requests
+from urllib3.util import make_headers
+
+from .exceptions import LimeSurveyError
+
+logger = logging.getLogger(__name__)
+
+# niquests is a drop-in replacement for requests that supports HTTP/2 and
+# multiplexing of concurrent requests over a single connection
+try:
+    import niquests
+except ImportError:
+    niquests = None  # type: ignore[assignment]
+_MULTIPLEXED = niquests is not None
+_http = niquests if _MULTIPLEXED else requests
+
+
+def _json_dumps(obj: Any) -> bytes:
+    return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+
+# orjson is much faster than the standard library, especially on large
+# list_participants responses, but remains an optional dependency
+try:
+    import orjson
+except ImportError:
+    _dumps = _json_dumps
+    _loads = json.loads
+else:
+    _dumps = orjson.dumps  # type: ignore[assignment]
+    _loads = orjson.loads  # type: ignore[assignment]
+
+# ijson parses large responses incrementally, as they are received
+try:
+    import ijson  # type: ignore[import-untyped]
+except ImportError:
+    ijson = None
+
+# otherwise simdjson parses responses lazily, only decoding accessed values
+try:
+    import simdjson
+except ImportError:
+    simdjson = None  # type: ignore[assignment]
+
+# stands for variable parameters in pre-serialized request templates
+_PLACEHOLDER = u'\x00'
+
+
+def _templatable(participant: Any, attributes: Any) -> bool:
+    """Whether `get_participant_properties` fits a pre-serialized template
+
+    Participant IDs may be integers or strings of digits, such as the
+    `tid` values returned by LSRC2. Templates send both as JSON integers.
+
+    """
+    if not isinstance(attributes, (list, tuple)):
+        return False
+    if isinstance(participant, str):
+        return participant.isdigit() and participant.isascii()
+    return isinstance(participant, int) and not isinstance(participant, bool)
+
+
+# pre-serialized `release_session_key` request, %-formatted with the request
+# id and the JSON-serialized session key
+_RELEASE_TEMPLATE = (b'{"jsonrpc":"2.0","id":%d,'
+                     b'"method":"release_session_key","params":[%s]}')
+
+
+def _materialize(value):
+    """Convert lazy simdjson values to Python objects"""
+    if isinstance(value, simdjson.Object):
+        return value.as_dict()
+    if isinstance(value, simdjson.Array):
+        return value.as_list()
+    return value
+
+
+# Requests sessions are shared by Session instances accessing the same URL,
+# so that connections are kept alive from one Session instance to the next
+_SESSION_POOL: Dict[str, Any] = {}
+_SESSION_POOL_LOCK = threading.Lock()
+
+
+def _pooled_session(url):
+    """Return the Requests session shared by Session instances for `url`"""
+    with _SESSION_POOL_LOCK:
+        try:
+            return _SESSION_POOL[url]
+        except KeyError:
+            # a single host, but possibly many concurrent requests
+            if _MULTIPLEXED:
+                # keep the niquests adapters, with their resolver and caches
+                session = _http.Session(multiplexed=True, pool_connections=1,
+                                        pool_maxsize=50, retries=0)
+            else:
+                session = _http.Session()
+                adapter = _http.adapters.HTTPAdapter(pool_connections=1,
+                                                     pool_maxsize=50,
+                                                     max_retries=0)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+            # LSRC2 needs no cookies, the session key is passed along with
+            # each request
+            session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+            # redirects are not followed, not even 307 and 308 redirects
+            # that would preserve the request body: a URL that redirects,
+            # e.g. from http:// to https://, raises TooManyRedirects
+            session.max_redirects = 0
+            # Keep-alive is 100% automatic in Requests, thanks to urllib3
+            session.headers.update({'content-type': 'application/json'})
+            # ask for compressed responses, in formats urllib3 can decode:
+            # gzip and deflate, br if brotli is installed
+            session.headers.update(make_headers(accept_encoding=True))
+            _SESSION_POOL[url] = session
+            return session
+
+
+def close_sessions():
+    """Close Requests sessions shared by :class:`Session` instances
+
+    Instances created later share new sessions. Existing instances keep
+    using closed sessions, which reopen connections as needed.
+
+    """
+    with _SESSION_POOL_LOCK:
+        sessions = list(_SESSION_POOL.values())
+        _SESSION_POOL.clear()
+    for session in sessions:
+        session.close()
+
+
+# LSRC2 returns errors as a dict with a 'status' attribute, completely at
+# odds with JSON-RPC error handling, handlers turn them into JSON-RPC errors
+
+def _status_error(status: str, error: Any) -> dict:
+    return {
+        'code': -32099,  # implementation-defined error in JSON-RPC
+        'message': status,
+    }
+
+
+def _no_tokens_found(status: str, error: Any) -> None:
+    # When a survey is empty, LSRC2 also returns a dict:
+    # {"status": "No Tokens found"}
+    if error is not None:
+        logger.error('JSON-RPC error report does not match "status"')
+    return None
+
+
+# list_participants statuses, other statuses are errors
+_STATUS_HANDLERS: Dict[str, Any] = {
+    'No Tokens found': _no_tokens_found,
+}
+
+
+def _batch_error(message: str) -> dict:
+    return {
+        'code': -32603,  # internal error in JSON-RPC
+        'message': message,
+    }
+
+
+def _unpack(request_id: int, response: dict) -> Tuple[Any, Any]:
+    """Return result and error of a JSON-RPC response"""
+    logger.debug('JSON-RPC response: %s', response)
+    if response['id'] != request_id:
+        raise LimeSurveyError('JSON-RPC response id {0} does not match '
+                              'request id {1}'.format(response['id'], request_id),
+                              -32603)  # internal error in JSON-RPC
+    # a JSON-RPC 2.0 response has either a result or an error member
+    result = response.get('result')
+    error = response.get('error')
+    if error:
+        logger.error('LSRC2 error: %s', error)
+    return result, error
+
+
+def _session_key(response: Any, error: Any) -> Optional[str]:
+    """Return session key from `get_session_key` response, None on error"""
+    # fix non-sensical LSRC2 error handling
+    # completely at odds with JSON-RPC error handling
+    try:
+        status = response['status']
+    except (TypeError, KeyError):
+        if error is not None:
+            logger.error('LSRC2 failed to create a session key')
+            response = None
+        else:
+            logger.info('LSRC2 new session key: %s', response)
+    else:
+        logger.error(status)
+        response = None
+    return response
+
+
+class _SurveysCache(object):
+    """Cache of `list_surveys` response, shared by Session and AsyncSession
+
+    Surveys do not change during the lifetime of a session key.
+
+    """
+
+    def __init__(self) -> None:
+        self._surveys: Optional[List[dict]] = None
+
+    @staticmethod
+    def _copy(surveys: List[dict]) -> Tuple[Any, Any]:
+        # callers cannot alter the cache
+        return [dict(survey) for survey in surveys], None
+
+    def get(self) -> Optional[Tuple[Any, Any]]:
+        """Return cached response, None if there is none"""
+        if self._surveys is None:
+            return None
+        return self._copy(self._surveys)
+
+    def update(self, surveys: Any, error: Any) -> Tuple[Any, Any]:
+        """Cache `list_surveys` response, then return it"""
+        # LSRC2 reports errors such as "No surveys found" as a dict
+        # with a 'status' attribute, only cache actual lists of surveys
+        if error is not None or not isinstance(surveys, list):
+            return surveys, error
+        self._surveys = surveys
+        return self._copy(surveys)
+
+    def clear(self) -> None:
+        self._surveys = None
+
+
+def _participants(responses: Any,
+                  error: Any) -> Tuple[Any, Any]:
+    """Return participants and error from `list_participants` response"""
+    if isinstance(responses, list):
+        return responses, error
+
+    # fix non-sensical LSRC2 error handling
+    try:
+        status = responses['status']
+    except (TypeError, KeyError):
+        return responses, error
+    return [], _STATUS_HANDLERS.get(status, _status_error)(status, error)
+
+
+def _checked_participants(responses: Any, error: Any) -> Any:
+    """Return participants from `list_participants` response
+
+    Raises
+    ------
+    LimeSurveyError
+        On JSON-RPC errors and LSRC2 statuses other than "No Tokens found".
+
+    """
+    responses, error = _participants(responses, error)
+    if isinstance(error, dict):
+        raise LimeSurveyError(error.get('message'), error.get('code'))
+    if error is not None:
+        # LSRC2 reports some exceptions as a bare message
+        raise LimeSurveyError(error, -32603)  # internal error in JSON-RPC
+    return responses
+
+
+def _stream_participants(raw: Any, request_id: int) -> Iterator[Any]:
+    """Yield participants while parsing `list_participants` response with ijson
+
+    The other members of the response are checked once it has been
+    completely parsed, as LSRC2 sends `error` after `result`.
+
+    """
+    response: Dict[str, Any] = {}
+    builder = None
+    path = None
+    # use_float: floats instead of Decimal, as with the other parsers
+    for prefix, event, value in ijson.parse(raw, use_float=True):
+        if builder is None:
+            if prefix == 'result' and event in ('start_array', 'end_array'):
+                # participants are yielded, not kept in the response
+                response['result'] = []
+                continue
+            if not prefix:
+                continue  # start, end and keys of the response itself
+            builder = ijson.ObjectBuilder()
+            path = prefix
+            builder.event(event, value)
+            if event in ('start_map', 'start_array'):
+                continue
+        else:
+            builder.event(event, value)
+            if prefix != path or event not in ('end_map', 'end_array'):
+                continue
+        # builder holds a complete participant or response member
+        if path == 'result.item':
+            yield builder.value
+        else:
+            response[path] = builder.value
+        builder = None
+    _checked_participants(*_unpack(request_id, response))
+
+
+class Participant(object):
+    """ Participant of a survey.
+
+    Uses much less memory than the dictionaries returned by
+    :meth:`Session.participants`, as attributes are stored in slots.
+
+    Attributes
+    ----------
+    tid : int
+        Participant ID.
+    token : str
+        Participant token.
+    attribute_1 : str
+        First extra participant attribute, if requested.
+
+    """
+    __slots__ = ('tid', 'token', 'attribute_1')
+
+    def __init__(self, tid, token, attribute_1=None):
+        self.tid = tid
+        self.token = token
+        self.attribute_1 = attribute_1
+
+    def __repr__(self):
+        return 'Participant(tid={0!r}, token={1!r}, attribute_1={2!r})'.format(
+            self.tid, self.token, self.attribute_1)
+
+    @classmethod
+    def from_dict(cls, participant):
+        return cls(int(participant['tid']), participant.get('token'),
+                   participant.get('attribute_1'))
 
 
 class Session(object):
@@ -53,23 +386,37 @@ class Session(object):
       >>> type(surveys), type(error)
       (list, NoneType)
 
+    Instances accessing the same URL share their Requests session, so that
+    connections are kept alive from one instance to the next. Changes to
+    the :attr:`session` of such an instance affect all of them: pass a
+    session with specific settings to the constructor instead. Shared
+    sessions remain open until :func:`close_sessions` is called.
+
     For now Session is limited to JSON-RPC requests and provides no way
     to switch to XML-RPC requests as the documentation reads:
         We recommend in general to use JSON-RPC because it is well tested
         and has a much smaller footprint than XML-RPC.
 
+    Redirects are not followed, `url` must be the actual LSRC2 URL, not
+    a URL that redirects to it, such as an http:// URL redirecting to
+    https://. Otherwise requests raise `TooManyRedirects`.
+
     Parameters
     ----------
     url : str
     username : str
     password : str
+    session : requests.Session, optional
+        HTTP session to use instead of the one shared by instances with
+        the same URL, e.g. a session with specific settings.
 
     Attributes
     ----------
     url : str
         Base LSRC2 URL.
     session : requests.Session
-        Requests session instance.
+        Requests session instance, shared by instances with the same URL
+        unless passed to the constructor. Do not customize.
     key : str
         LSRC2 session key.
 
@@ -79,14 +426,18 @@ class Session(object):
     """
     __attrs__ = ['url', 'session', 'key']
 
-    __request_id = 0
-
-    def __init__(self, url, username, password):
+    def __init__(self, url: str, username: str, password: str,
+                 session: Any = None) -> None:
         self.url = url
-        # start a Requests session
-        self.session = requests.Session()
-        # Keep-alive is 100% automatic in Requests, thanks to urllib3
-        self.session.headers.update({'content-type': 'application/json'})
+        # reuse the Requests session of previous instances
+        if session is None:
+            session = _pooled_session(url)
+        self.session = session
+        # JSON-RPC request ids, specific to this instance
+        self._id_iter = itertools.count(1)
+        # pre-serialized requests, see _template()
+        self._templates: Dict[tuple, bytes] = {}
+        self._surveys_cache = _SurveysCache()
         # start a LimeSurvey RemoteControl 2 session
         self.key = self._get_session_key(username, password)
 
@@ -98,37 +449,142 @@ class Session(object):
         return False  # re-raises the exception
 
     def close(self):
-        """Release LimeSurvey session key, then close Requests session"""
+        """Release LimeSurvey session key
+
+        The Requests session is kept open, see :func:`close_sessions`.
+
+        """
         self._release_session_key(self.key)
         self.key = None
-        self.session.close()
 
-    @staticmethod
-    def _generate_request_id():
-        Session.__request_id += 1
-        return Session.__request_id
+    def _generate_request_id(self) -> int:
+        return next(self._id_iter)
 
-    @staticmethod
-    def _request(method, params):
+    def _request(self, method: str, params: list) -> Dict[str, Any]:
         return {
             'jsonrpc': '2.0',
-            'id': Session._generate_request_id(),
+            'id': self._generate_request_id(),
             'method': method,
             'params': params,
         }
 
-    def _post(self, request):
-        logging.debug('JSON-RPC request: {0}'.format(request))
-        assert 'method' in request and 'params' in request and 'id' in request
-        response = self.session.post(self.url, data=json.dumps(request))
-        response = response.json()
-        logging.debug('JSON-RPC response: {0}'.format(response))
-        assert response['id'] == request['id']
-        result = response['result']
-        error = response['error']
-        if error:
-            logging.error('LSRC2 error: {0}'.format(error))
-        return result, error
+    @staticmethod
+    def _template(method: str, params: list) -> bytes:
+        """Pre-serialize a JSON-RPC request
+
+        Parameters
+        ----------
+        method : str
+        params : list
+            Parameters, variable parameters set to `_PLACEHOLDER`.
+
+        Returns
+        -------
+        bytes
+            Request body, to be %-formatted with the request id followed
+            by integer values of variable parameters.
+
+        """
+        template = _dumps({
+            'jsonrpc': '2.0',
+            'id': _PLACEHOLDER,
+            'method': method,
+            'params': params,
+        })
+        return template.replace(b'%', b'%%').replace(b'"\\u0000"', b'%d')
+
+    def _post(self, request: Dict[str, Any]) -> Tuple[Any, Any]:
+        return self._post_raw(_dumps(request), request['id'])
+
+    def _post_raw(self, body: bytes,
+                  request_id: int) -> Tuple[Any, Any]:
+        logger.debug('JSON-RPC request: %s', body)
+        response = self.session.post(self.url, data=body)
+        response = _loads(response.content)
+        return _unpack(request_id, response)
+
+    def _post_batch_raw(self, body: bytes,
+                        request_ids: List[int]) -> List[Tuple[Any, Any]]:
+        logger.debug('JSON-RPC batch request: %s', body)
+        response = self.session.post(self.url, data=body)
+        response = _loads(response.content)
+        if not isinstance(response, list):
+            # the server rejected the batch or does not support batches,
+            # in which case it returns a single response with a null id
+            logger.debug('JSON-RPC response: %s', response)
+            error = isinstance(response, dict) and response.get('error')
+            if not error:
+                error = _batch_error('JSON-RPC batch request not supported')
+            logger.error('LSRC2 error: %s', error)
+            return [(None, error)] * len(request_ids)
+        responses = {r.get('id'): r for r in response if isinstance(r, dict)}
+        results: List[Tuple[Any, Any]] = []
+        for request_id in request_ids:
+            response = responses.get(request_id)
+            if response is None:
+                error = _batch_error('JSON-RPC batch response misses '
+                                     'request id {0}'.format(request_id))
+                logger.error('LSRC2 error: %s', error)
+                results.append((None, error))
+            else:
+                results.append(_unpack(request_id, response))
+        return results
+
+    def batch(self, calls):
+        """Send multiple calls in a single JSON-RPC batch request
+
+        Parameters
+        ----------
+        calls : list
+            List of (method, params) pairs.
+
+        Returns
+        -------
+        list
+            List of (response, error) pairs, in the order of `calls`.
+            If the server rejects the batch, all calls share its error.
+
+        """
+        batch = [self._request(method, params) for method, params in calls]
+        if not batch:
+            return []
+        return self._post_batch_raw(_dumps(batch),
+                                    [request['id'] for request in batch])
+
+    def pipeline(self, calls):
+        """Send multiple calls as separate JSON-RPC requests
+
+        With niquests_, requests are sent concurrently, multiplexed over
+        a single HTTP/2 connection, otherwise they are sent one after the
+        other. Unlike :meth:`batch`, this does not require JSON-RPC batch
+        support on the server side.
+
+        Parameters
+        ----------
+        calls : list
+            List of (method, params) pairs.
+
+        Returns
+        -------
+        list
+            List of (response, error) pairs, in the order of `calls`.
+
+        .. _niquests: https://niquests.readthedocs.io
+
+        """
+        batch = [self._request(method, params) for method, params in calls]
+        responses = [self.session.post(self.url, data=_dumps(request))
+                     for request in batch]
+        self._gather(responses)
+        return [_unpack(request['id'], _loads(response.content))
+                for request, response in zip(batch, responses)]
+
+    def _gather(self, responses):
+        """Wait for in-flight multiplexed responses"""
+        # plain Requests sessions, or niquests sessions passed to __init__
+        # without multiplexing, have already received responses
+        if getattr(self.session, 'multiplexed', False):
+            self.session.gather(*responses)
 
     def _get_session_key(self, username, password):
         """Call `get_session_key`_
@@ -148,26 +604,7 @@ class Session(object):
         """
         request = self._request('get_session_key', [username, password])
         response, error = self._post(request)
-
-        # fix non-sensical LSRC2 error handling
-        # completely at odds with JSON-RPC error handling
-        try:
-            status = response['status']
-        except (TypeError, KeyError):
-            if error is not None:
-                logging.error('LSRC2 failed to create a session key')
-                response = None
-            else:
-                logging.info('LSRC2 new session key: {0}'.format(response))
-        else:
-            logging.error(status)
-            error = {
-                'code': -32099,  # implementation-defined error in JSON-RPC
-                'message': status,
-            }
-            response = None
-
-        return response
+        return _session_key(response, error)
 
     def _release_session_key(self, key):
         """Call `release_session_key`_
@@ -179,11 +616,12 @@ class Session(object):
         .. _release_session_key: http://api.limesurvey.org/classes/remotecontrol_handle.html#method_release_session_key
 
         """
-        request = self._request('release_session_key', [key])
-        logging.info('LSRC2 release session key: {0}'.format(key))
-        response, error = self._post(request)  # returns ('OK', None) even if bogus key
+        logger.info('LSRC2 release session key: %s', key)
+        body = _RELEASE_TEMPLATE % (self._generate_request_id(), _dumps(key))
+        # ignore response: ('OK', None) even if bogus key
+        self.session.post(self.url, data=body).close()
 
-    def surveys(self):
+    def surveys(self) -> Tuple[Any, Any]:
         """Call `list_surveys`_
 
         If user is admin, returns all surveys, otherwise only those
@@ -196,65 +634,254 @@ class Session(object):
             error : dict
                 Dictionary contains `code` and `message`.
 
+        Lists of surveys are cached, see :meth:`invalidate_surveys`.
+
         .. _list_surveys: http://api.limesurvey.org/classes/remotecontrol_handle.html#method_list_surveys
 
         """
-        request = self._request('list_surveys', [self.key])
-        return self._post(request)
+        response = self._surveys_cache.get()
+        if response is None:
+            request = self._request('list_surveys', [self.key])
+            response = self._surveys_cache.update(*self._post(request))
+        return response
+
+    def invalidate_surveys(self):
+        """Clear the response cached by :meth:`surveys`"""
+        self._surveys_cache.clear()
 
     def participants(self, survey, start=0, limit=500, unused=False, attributes=False):
+        """Call `list_participants`_
+
+        Participant attributes listed in `attributes` are returned along
+        with each participant. This is the preferred way to get attributes
+        of many participants: a single request instead of one call to
+        :meth:`participant_properties` per participant.
+
+        Parameters
+        ----------
+        survey : int
+        start : int
+        limit : int
+        unused : bool
+        attributes : list
+            Extra participant attributes to return.
+
+        Returns
+        -------
+            response : array
+                Array of participants.
+            error : dict
+                Dictionary contains `code` and `message`.
+
+        .. _list_participants: http://api.limesurvey.org/classes/remotecontrol_handle.html#method_list_participants
+
+        """
         request = self._request('list_participants',
                                 [self.key, survey, start, limit, unused, attributes])
         responses, error = self._post(request)
+        return _participants(responses, error)
 
-        # fix non-sensical LSRC2 error handling
-        # completely at odds with JSON-RPC error handling
-        try:
-            status = responses['status']
-        except (TypeError, KeyError):
-            pass
+    def participant_rows(self, survey, start=0, limit=500, unused=False,
+                         attributes=False):
+        """Same as :meth:`participants`, returns :class:`Participant` objects
+
+        :class:`Participant` only holds `attribute_1`, use
+        :meth:`participants_columns` to get other attributes.
+
+        Returns
+        -------
+            response : list
+                List of :class:`Participant`.
+            error : dict
+                Dictionary contains `code` and `message`.
+
+        Raises
+        ------
+        ValueError
+            If `attributes` requests attributes other than `attribute_1`.
+
+        """
+        if attributes and list(attributes) != ['attribute_1']:
+            raise ValueError('Participant only holds attribute_1, '
+                             'cannot hold {0}'.format(attributes))
+        participants, error = self.participants(survey, start, limit,
+                                                unused, attributes)
+        return [Participant.from_dict(p) for p in participants or []], error
+
+    def participants_columns(self, survey, start=0, limit=500, unused=False,
+                             attributes=False):
+        """Same as :meth:`participants`, returns columns instead of rows
+
+        Columns can be passed as is to `numpy.array` or
+        `pandas.DataFrame.from_dict`.
+
+        Returns
+        -------
+            response : dict
+                Lists of values of `tid` (as int), `token` and each
+                attribute in `attributes`, indexed by field name.
+            error : dict
+                Dictionary contains `code` and `message`.
+
+        """
+        participants, error = self.participants(survey, start, limit,
+                                                unused, attributes)
+        participants = participants or []
+        # same type as Participant.tid
+        columns = {'tid': [int(p['tid']) for p in participants]}
+        for field in ('token',) + tuple(attributes or ()):
+            columns[field] = [p.get(field) for p in participants]
+        return columns, error
+
+    def iter_participants(self, survey, start=0, limit=500, unused=False,
+                          attributes=False, fields=('tid', 'token')):
+        """Iterate over participants returned by :meth:`participants`
+
+        If ijson_ is available, the response is parsed while it is being
+        received, without ever loading the whole response in memory.
+        Otherwise, if simdjson_ is available, the response is parsed
+        lazily and only the requested fields are decoded.
+        Only the requested fields of each participant are kept.
+
+        Errors are raised instead of being returned, after participants
+        already received if the response is streamed with ijson_.
+
+        Parameters
+        ----------
+        survey : int
+        start : int
+        limit : int
+        unused : bool
+        attributes : list
+            Extra participant attributes to return.
+        fields : tuple
+            Participant fields to keep.
+
+        Yields
+        ------
+        dict
+            Requested fields of each participant.
+
+        Raises
+        ------
+        LimeSurveyError
+            On JSON-RPC errors, LSRC2 statuses other than "No Tokens found"
+            and response ids that do not match the request id.
+
+        .. _ijson: https://pypi.org/project/ijson/
+        .. _simdjson: https://pypi.org/project/pysimdjson/
+
+        """
+        request = self._request('list_participants',
+                                [self.key, survey, start, limit, unused, attributes])
+        if ijson is not None:
+            response = self.session.post(self.url, data=_dumps(request),
+                                         stream=True)
+            # release the pooled connection even if iteration stops early
+            try:
+                response.raw.decode_content = True
+                for participant in _stream_participants(response.raw,
+                                                        request['id']):
+                    yield {field: participant[field]
+                           for field in fields if field in participant}
+            finally:
+                response.close()
+        elif simdjson is not None:
+            response = self.session.post(self.url, data=_dumps(request))
+            document = simdjson.Parser().parse(response.content)
+            participants = document.get('result')
+            lazy = isinstance(participants, simdjson.Array)
+            # check the other members before decoding participants
+            _checked_participants(*_unpack(request['id'], {
+                'id': document.get('id'),
+                'result': [] if lazy else _materialize(participants),
+                'error': _materialize(document.get('error')),
+            }))
+            if lazy:
+                for participant in participants:
+                    yield {field: _materialize(participant[field])
+                           for field in fields if field in participant}
         else:
-            # LSRC2 returns errors as a dict with a 'status' attribute
-            if status == 'No Tokens found':
-                # When a survey is empty, LSRC2 also returns a dict:
-                # {"status": "No Tokens found"}
-                if error is not None:
-                    logging.error('JSON-RPC error report does not match "status"')
-                    error = None
-            else:
-                error = {
-                    'code': -32099,  # implementation-defined error in JSON-RPC
-                    'message': status,
-                }
-            responses = []
+            participants, error = self._post(request)
+            participants = _checked_participants(participants, error)
+            if isinstance(participants, list):
+                for participant in participants:
+                    yield {field: participant[field]
+                           for field in fields if field in participant}
+
+    def _participant_properties_template(self, survey, attributes):
+        key = ('get_participant_properties', survey, tuple(attributes))
+        try:
+            return self._templates[key]
+        except KeyError:
+            template = self._template('get_participant_properties',
+                                      [self.key, survey, _PLACEHOLDER, attributes])
+            self._templates[key] = template
+            return template
+
+    def participant_properties(self, survey, participant, attributes=None):
+        if not _templatable(participant, attributes):
+            # e.g. participant selected by query instead of participant ID,
+            # or all properties requested with null attributes
+            request = self._request('get_participant_properties',
+                                    [self.key, survey, participant, attributes])
+            return self._post(request)
+        template = self._participant_properties_template(survey, attributes)
+        request_id = self._generate_request_id()
+        return self._post_raw(template % (request_id, int(participant)),
+                              request_id)
+
+    def participant_properties_many(self, survey, participants,
+                                    attributes=None):
+        """Call `get_participant_properties` for multiple participants
+
+        The calls are sent to the server as a single JSON-RPC batch request.
 
-        return responses, error
+        Parameters
+        ----------
+        survey : int
+        participants : list
+            Participant IDs or queries.
+        attributes : list
+            Participant attributes to return, all of them if None.
 
-    def participant_properties(self, survey, participant, attributes):
-        request = self._request('get_participant_properties',
-                                [self.key, survey, participant, attributes])
-        return self._post(request)
+        Returns
+        -------
+        list
+            List of (response, error) pairs, in the order of `participants`.
+
+        """
+        if not participants:
+            return []
+        if not all(_templatable(participant, attributes)
+                   for participant in participants):
+            return self.batch(('get_participant_properties',
+                               [self.key, survey, participant, attributes])
+                              for participant in participants)
+        template = self._participant_properties_template(survey, attributes)
+        request_ids = [self._generate_request_id() for participant in participants]
+        body = b'[' + b','.join(template % (request_id, int(participant))
+                                for request_id, participant
+                                in zip(request_ids, participants)) + b']'
+        return self._post_batch_raw(body, request_ids)
 
     def delete_participants(self, survey, tokens):
         request = self._request('delete_participants',
                                 [self.key, survey, tokens])
         responses, error = self._post(request)
+        if isinstance(responses, list):
+            return responses, error
 
         # When a survey is empty, LimeSurvey returns this dict:
         #    {"status": "No Data, could not get max id."}
-        if type(responses) is dict:
+        if isinstance(responses, dict):
             if 'status' in responses:
-                error = {
-                    'code': -32099,  # implementation-defined error in JSON-RPC
-                    'message': responses['status'],
-                }
+                # unlike list_participants, any status is an error
+                error = _status_error(responses['status'], error)
             else:
                 message = 'JSON-RPC function "export_responses" returned a dictionnary, expected a Base64-encoded string'
-                logging.error(message)
-                error = {
-                    'code': -32099,  # implementation-defined error in JSON-RPC
-                    'message': message,
-                }
+                logger.error(message)
+                error = _status_error(message, error)
             responses = []
 
         return responses, error
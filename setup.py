@@ -27,6 +27,8 @@
 # The fact that you are presently reading this means that you have had
 # knowledge of the CeCILL-C license and that you accept its terms.
 
+import os
+
 from setuptools import setup, find_packages
 
 
@@ -40,6 +42,15 @@ def license():
         return f.read()
 
 
+# Optionally compile lsrc2.session with mypyc, the pure Python module
+# remains in use whenever the compiled extension is missing.
+if os.environ.get('LSRC2_USE_MYPYC') == '1':
+    from mypyc.build import mypycify
+    ext_modules = mypycify(['lsrc2/session.py'])
+else:
+    ext_modules = []
+
+
 setup(
     name='lsrc2',
     version='0.0.1',
@@ -49,6 +60,13 @@ setup(
     author='Dimitri Papadopoulos',
     url='https://github.com/neurospin/lsrc2',
     packages=find_packages(exclude=('tests', 'docs')),
+    ext_modules=ext_modules,
+    python_requires='>=3.7',
+    install_requires=['requests'],
+    extras_require={
+        'fast': ['orjson', 'niquests', 'ijson', 'brotli'],
+        'async': ['aiohttp'],
+    },
     classifiers=[
         "License :: OSI Approved :: CeCILL-C",
         "Intended Audience :: Developers",
@@ -56,8 +74,8 @@ setup(
         "Environment :: Console",
         "Development Status :: 4 - Beta",
         "Programming Language :: Python",
-        "Programming Language :: Python :: 2.7",
-        "Programming Language :: Python :: 3.4",
+        "Programming Language :: Python :: 3",
+        "Programming Language :: Python :: 3 :: Only",
         "Operating System :: OS Independent",
         "Topic :: Scientific/Engineering",
         "Topic :: Utilities",
@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2016 CEA
+#
+# This software is governed by the CeCILL-C license under French law and
+# abiding by the rules of distribution of free software. You can use,
+# modify and/ or redistribute the software under the terms of the CeCILL-C
+# license as circulated by CEA, CNRS and INRIA at the following URL
+# "http://www.cecill.info".
+#
+# As a counterpart to the access to the source code and rights to copy,
+# modify and redistribute granted by the license, users are provided only
+# with a limited warranty and the software's author, the holder of the
+# economic rights, and the successive licensors have only limited
+# liability.
+#
+# In this respect, the user's attention is drawn to the risks associated
+# with loading, using, modifying and/or developing or reproducing the
+# software by the user in light of its specific status of free software,
+# that may mean that it is complicated to manipulate, and that also
+# therefore means that it is reserved for developers and experienced
+# professionals having in-depth computer knowledge. Users are therefore
+# encouraged to load and test the software's suitability as regards their
+# requirements in conditions enabling the security of their systems and/or
+# data to be ensured and, more generally, to use and operate it in the
+# same conditions as regards security.
+#
+# The fact that you are presently reading this means that you have had
+# knowledge of the CeCILL-C license and that you accept its terms.
+
+"""Offline tests of lsrc2.AsyncSession, with a stubbed aiohttp session."""
+
+import asyncio
+import json
+
+import pytest
+
+pytest.importorskip('aiohttp')
+
+import lsrc2  # noqa: E402
+from lsrc2 import aio  # noqa: E402
+
+URL = 'https://example.org/admin/remotecontrol'
+KEY = 'k%d"x'
+
+
+class StubClientResponse(object):
+
+    def __init__(self, content):
+        self.content = content
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return False
+
+    async def read(self):
+        return self.content
+
+
+class StubClientSession(object):
+    """Replies to each POST with the next JSON-RPC response"""
+
+    def __init__(self, *replies):
+        self.replies = list(replies)
+        self.bodies = []
+        self.closed = 0
+
+    def __call__(self, **kwargs):
+        # stands for the aiohttp.ClientSession class
+        self.kwargs = kwargs
+        return self
+
+    def post(self, url, data=None):
+        assert url == URL
+        self.bodies.append(data)
+        return StubClientResponse(json.dumps(self.replies.pop(0)).encode('utf-8'))
+
+    async def close(self):
+        self.closed += 1
+
+
+def reply(request_id, result, error=None):
+    return {'id': request_id, 'result': result, 'error': error}
+
+
+@pytest.fixture
+def stub_session(monkeypatch):
+    """Make AsyncSession open a stub session, replying with `replies`"""
+    def stub_session(*replies):
+        stub = StubClientSession(*replies)
+        monkeypatch.setattr(aio.aiohttp, 'ClientSession', stub)
+        return stub
+    return stub_session
+
+
+def test_calls(stub_session):
+    surveys = [{'sid': 12, 'surveyls_title': 'Survey'}]
+    stub = stub_session(reply(1, KEY),
+                        reply(2, surveys),
+                        reply(3, {'status': 'No Tokens found'}),
+                        reply(4, {'attribute_1': 'a'}),
+                        reply(5, 'OK'))
+
+    async def main():
+        async with lsrc2.AsyncSession(URL, 'user', 'password') as session:
+            assert session.key == KEY
+            assert await session.surveys() == (surveys, None)
+            assert await session.surveys() == (surveys, None)
+            assert await session.participants(12) == ([], None)
+            assert await session.participant_properties(12, 3) == \
+                ({'attribute_1': 'a'}, None)
+        return session
+
+    session = asyncio.run(main())
+    assert session.key is None
+    assert session.session is None
+    assert stub.closed == 1
+    assert isinstance(stub.kwargs['cookie_jar'], aio.aiohttp.DummyCookieJar)
+    assert json.loads(stub.bodies[3])['params'] == [KEY, 12, 3, None]
+    assert stub.bodies[4] == \
+        b'{"jsonrpc":"2.0","id":5,"method":"release_session_key",' \
+        b'"params":["k%d\\"x"]}'
+
+
+def test_close_twice(stub_session):
+    stub = stub_session(reply(1, KEY), reply(2, 'OK'))
+
+    async def main():
+        session = lsrc2.AsyncSession(URL, 'user', 'password')
+        await session.close()  # never opened
+        await session.open()
+        await session.close()
+        await session.close()
+
+    asyncio.run(main())
+    assert len(stub.bodies) == 2
+    assert stub.closed == 1
+
+
+def test_open_failure(stub_session):
+    # response id mismatch
+    stub = stub_session(reply(2, KEY))
+
+    async def main():
+        session = lsrc2.AsyncSession(URL, 'user', 'password')
+        with pytest.raises(lsrc2.LimeSurveyError):
+            await session.open()
+        assert session.session is None
+        await session.close()
+
+    asyncio.run(main())
+    assert len(stub.bodies) == 1
+    assert stub.closed == 1
@@ -28,6 +28,8 @@
 # The fact that you are presently reading this means that you have had
 # knowledge of the CeCILL-C license and that you accept its terms.
 
+import asyncio
+
 import lsrc2
 
 LS_DEMO_URL = 'https://lsdemo.limequery.com/admin/remotecontrol'
@@ -42,7 +44,10 @@ def test1(base_url, username, password):
             title = survey['surveyls_title']
             sid = survey['sid']
             print(u'▶ {} ▶ {}'.format(sid, title))
-            participants, error = session.participants(sid)
+            participants, error = session.participants(sid, attributes=['attribute_1'])
+            for participant in participants:
+                print(u'  ▶ {} ▶ {}'.format(participant['token'],
+                                           participant.get('attribute_1')))
 
 
 def test2(base_url, username, password):
@@ -55,9 +60,24 @@ def test2(base_url, username, password):
     session.close()
 
 
+async def participants_async(base_url, username, password):
+    async with lsrc2.AsyncSession(base_url, username, password) as session:
+        surveys, error = await session.surveys()
+        results = await asyncio.gather(*(session.participants(survey['sid'])
+                                         for survey in surveys))
+        for survey, (participants, error) in zip(surveys, results):
+            print(u'▶ {} ▶ {} participants'.format(survey['sid'],
+                                                  len(participants)))
+
+
+def test3(base_url, username, password):
+    asyncio.run(participants_async(base_url, username, password))
+
+
 def main():
     test1(LS_DEMO_URL, LS_DEMO_USERNAME, LS_DEMO_PASSWORD)
     test2(LS_DEMO_URL, LS_DEMO_USERNAME, LS_DEMO_PASSWORD)
+    test3(LS_DEMO_URL, LS_DEMO_USERNAME, LS_DEMO_PASSWORD)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,395 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2016 CEA
+#
+# This software is governed by the CeCILL-C license under French law and
+# abiding by the rules of distribution of free software. You can use,
+# modify and/ or redistribute the software under the terms of the CeCILL-C
+# license as circulated by CEA, CNRS and INRIA at the following URL
+# "http://www.cecill.info".
+#
+# As a counterpart to the access to the source code and rights to copy,
+# modify and redistribute granted by the license, users are provided only
+# with a limited warranty and the software's author, the holder of the
+# economic rights, and the successive licensors have only limited
+# liability.
+#
+# In this respect, the user's attention is drawn to the risks associated
+# with loading, using, modifying and/or developing or reproducing the
+# software by the user in light of its specific status of free software,
+# that may mean that it is complicated to manipulate, and that also
+# therefore means that it is reserved for developers and experienced
+# professionals having in-depth computer knowledge. Users are therefore
+# encouraged to load and test the software's suitability as regards their
+# requirements in conditions enabling the security of their systems and/or
+# data to be ensured and, more generally, to use and operate it in the
+# same conditions as regards security.
+#
+# The fact that you are presently reading this means that you have had
+# knowledge of the CeCILL-C license and that you accept its terms.
+
+"""Offline tests of lsrc2.Session, with a stubbed HTTP session."""
+
+import importlib
+import io
+import json
+
+import pytest
+
+import lsrc2
+
+# not lsrc2.session, which is the session() function
+session_module = importlib.import_module('lsrc2.session')
+
+URL = 'https://example.org/admin/remotecontrol'
+KEY = 'k%d"x'  # characters that must be escaped in templates
+
+
+class StubResponse(object):
+
+    def __init__(self, content):
+        self.content = content
+        self.raw = io.BytesIO(content)
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class StubSession(object):
+    """Replies to each POST with the next JSON-RPC response"""
+
+    def __init__(self, *replies):
+        self.replies = list(replies)
+        self.bodies = []
+        self.responses = []
+
+    def post(self, url, data=None, **kwargs):
+        assert url == URL
+        self.bodies.append(data)
+        response = StubResponse(json.dumps(self.replies.pop(0)).encode('utf-8'))
+        self.responses.append(response)
+        return response
+
+
+def reply(request_id, result, error=None):
+    return {'id': request_id, 'result': result, 'error': error}
+
+
+@pytest.fixture
+def connect():
+    """Return a Session logged in with KEY, replying with `replies`"""
+    def connect(*replies):
+        stub = StubSession(reply(1, KEY), *replies)
+        session = lsrc2.Session(URL, 'user', 'password', session=stub)
+        del stub.bodies[:], stub.responses[:]
+        return session, stub
+    return connect
+
+
+def test_participant_properties_template(connect):
+    session, stub = connect(reply(2, {'attribute_1': 'a'}),
+                            reply(3, {'attribute_1': 'b'}))
+    assert session.participant_properties(12, 3, ['attribute_1%s']) == \
+        ({'attribute_1': 'a'}, None)
+    assert session.participant_properties(12, 4, ['attribute_1%s']) == \
+        ({'attribute_1': 'b'}, None)
+    assert stub.bodies == [
+        b'{"jsonrpc":"2.0","id":2,"method":"get_participant_properties",'
+        b'"params":["k%d\\"x",12,3,["attribute_1%s"]]}',
+        b'{"jsonrpc":"2.0","id":3,"method":"get_participant_properties",'
+        b'"params":["k%d\\"x",12,4,["attribute_1%s"]]}',
+    ]
+
+
+def test_participant_properties_template_digits(connect):
+    # LSRC2 returns participant IDs as strings, sent as integers
+    session, stub = connect(reply(2, {}))
+    assert session.participant_properties(12, '3', ['attribute_1']) == \
+        ({}, None)
+    assert stub.bodies == [
+        b'{"jsonrpc":"2.0","id":2,"method":"get_participant_properties",'
+        b'"params":["k%d\\"x",12,3,["attribute_1"]]}',
+    ]
+
+
+@pytest.mark.parametrize('participant, attributes', [
+    (3, None),
+    ('3a', ['attribute_1']),
+    (True, ['attribute_1']),
+    ({'token': 'abc'}, ['attribute_1']),
+])
+def test_participant_properties_generic(connect, participant, attributes):
+    session, stub = connect(reply(2, {}))
+    assert session.participant_properties(12, participant, attributes) == \
+        ({}, None)
+    assert json.loads(stub.bodies[0]) == {
+        'jsonrpc': '2.0',
+        'id': 2,
+        'method': 'get_participant_properties',
+        'params': [KEY, 12, participant, attributes],
+    }
+
+
+def test_participant_properties_many(connect):
+    # responses of a batch may come in any order
+    session, stub = connect([reply(3, {'attribute_1': 'b'}),
+                             reply(2, {'attribute_1': 'a'})])
+    assert session.participant_properties_many(12, [3, '4'], ['attribute_1']) == [
+        ({'attribute_1': 'a'}, None),
+        ({'attribute_1': 'b'}, None),
+    ]
+    assert stub.bodies == [
+        b'[{"jsonrpc":"2.0","id":2,"method":"get_participant_properties",'
+        b'"params":["k%d\\"x",12,3,["attribute_1"]]},'
+        b'{"jsonrpc":"2.0","id":3,"method":"get_participant_properties",'
+        b'"params":["k%d\\"x",12,4,["attribute_1"]]}]',
+    ]
+
+
+def test_participant_properties_many_generic(connect):
+    session, stub = connect([reply(2, {}), reply(3, {})])
+    assert session.participant_properties_many(
+        12, [3, {'token': 'abc'}], ['attribute_1']) == [({}, None)] * 2
+    assert [request['params'][2] for request in json.loads(stub.bodies[0])] == \
+        [3, {'token': 'abc'}]
+    assert session.participant_properties_many(12, []) == []
+    assert len(stub.bodies) == 1
+
+
+def test_batch_missing_id(connect):
+    session, stub = connect([reply(3, 'b')])
+    (result, error), second = session.batch([('a', []), ('b', [])])
+    assert result is None
+    assert error['code'] == -32603
+    assert second == ('b', None)
+
+
+def test_batch_rejected(connect):
+    error = {'code': -32600, 'message': 'Invalid Request'}
+    session, stub = connect({'jsonrpc': '2.0', 'id': None, 'error': error},
+                            {'jsonrpc': '2.0', 'id': None})
+    assert session.batch([('a', []), ('b', [])]) == [(None, error)] * 2
+    # no error member at all, e.g. a server that does not support batches
+    (result, error), second = session.batch([('a', []), ('b', [])])
+    assert result is None
+    assert error['code'] == -32603
+    assert second == (result, error)
+
+
+class StubMultiplexedSession(StubSession):
+    """Also records gather() calls, like a multiplexed niquests session"""
+
+    multiplexed = True
+
+    def __init__(self, *replies):
+        super(StubMultiplexedSession, self).__init__(*replies)
+        self.gathered = []
+
+    def gather(self, *responses):
+        self.gathered.append(responses)
+
+
+@pytest.mark.parametrize('multiplexed', [False, True])
+def test_pipeline(connect, multiplexed):
+    session, stub = connect(reply(2, 'a'), reply(3, None, {'code': 1}))
+    if multiplexed:
+        stub = StubMultiplexedSession(*stub.replies)
+        session.session = stub
+    assert session.pipeline([('a', [1]), ('b', [])]) == \
+        [('a', None), (None, {'code': 1})]
+    assert [json.loads(body) for body in stub.bodies] == [
+        {'jsonrpc': '2.0', 'id': 2, 'method': 'a', 'params': [1]},
+        {'jsonrpc': '2.0', 'id': 3, 'method': 'b', 'params': []},
+    ]
+    if multiplexed:
+        assert stub.gathered == [tuple(stub.responses)]
+
+
+def test_response_id_mismatch(connect):
+    session, stub = connect(reply(3, []))
+    with pytest.raises(lsrc2.LimeSurveyError) as excinfo:
+        session.surveys()
+    assert excinfo.value.code == -32603
+
+
+def test_error_message(connect):
+    # LSRC2 reports some exceptions as a bare message, not an error object
+    session, stub = connect(reply(2, None, 'Internal error'))
+    assert session.participants(12) == (None, 'Internal error')
+
+
+PARTICIPANTS = [
+    {'tid': '3', 'token': 'abc', 'participant_info': {'email': 'a@b.c'}},
+    {'tid': '4', 'token': 'def', 'participant_info': {'email': 'd@e.f'}},
+]
+
+
+@pytest.fixture(params=['ijson', 'simdjson', 'json'])
+def parser(request, monkeypatch):
+    """Select the parser used by iter_participants"""
+    if request.param == 'ijson':
+        pytest.importorskip('ijson')
+    else:
+        monkeypatch.setattr(session_module, 'ijson', None)
+        if request.param == 'simdjson':
+            pytest.importorskip('simdjson')
+        else:
+            monkeypatch.setattr(session_module, 'simdjson', None)
+    return request.param
+
+
+def test_iter_participants(connect, parser):
+    session, stub = connect(reply(2, PARTICIPANTS + [{'tid': 5, 'score': 1.5}]),
+                            reply(3, {'status': 'No Tokens found'}))
+    fields = ('tid', 'participant_info', 'score')
+    participants = list(session.iter_participants(12, fields=fields))
+    assert participants == [
+        {'tid': '3', 'participant_info': {'email': 'a@b.c'}},
+        {'tid': '4', 'participant_info': {'email': 'd@e.f'}},
+        {'tid': 5, 'score': 1.5},
+    ]
+    assert type(participants[2]['score']) is float  # not Decimal
+    assert list(session.iter_participants(12)) == []
+
+
+@pytest.mark.parametrize('response, code', [
+    (reply(2, {'status': 'Invalid session key'}), -32099),
+    (reply(2, None, {'code': -32601, 'message': 'Method not found'}), -32601),
+    (reply(2, None, 'Internal error'), -32603),
+    (reply(2, PARTICIPANTS, {'code': 1, 'message': 'Error'}), 1),
+    (reply(3, PARTICIPANTS), -32603),
+])
+def test_iter_participants_error(connect, parser, response, code):
+    session, stub = connect(response)
+    with pytest.raises(lsrc2.LimeSurveyError) as excinfo:
+        list(session.iter_participants(12))
+    assert excinfo.value.code == code
+
+
+def test_iter_participants_closes_stream(connect, parser):
+    session, stub = connect(reply(2, PARTICIPANTS))
+    participants = session.iter_participants(12)
+    assert next(participants) == {'tid': '3', 'token': 'abc'}
+    participants.close()
+    if parser == 'ijson':
+        assert stub.responses[0].closed
+
+
+def test_participants_status(connect):
+    session, stub = connect(reply(2, {'status': 'No Tokens found'}),
+                            reply(3, {'status': 'Invalid session key'}))
+    assert session.participants(12) == ([], None)
+    assert session.participants(12) == \
+        ([], {'code': -32099, 'message': 'Invalid session key'})
+
+
+@pytest.mark.parametrize('status', [
+    'No Tokens found',
+    'No Data, could not get max id.',
+])
+def test_delete_participants_status(connect, status):
+    # unlike list_participants, any status is an error
+    session, stub = connect(reply(2, {'status': status}))
+    assert session.delete_participants(12, [3]) == \
+        ([], {'code': -32099, 'message': status})
+
+
+def test_participant_rows(connect):
+    session, stub = connect(reply(2, PARTICIPANTS),
+                            reply(3, [{'tid': '5', 'token': 'ghi',
+                                       'attribute_1': 'a'}]))
+    rows, error = session.participant_rows(12)
+    assert [(row.tid, row.token) for row in rows] == [(3, 'abc'), (4, 'def')]
+    assert error is None
+    rows, error = session.participant_rows(12, attributes=['attribute_1'])
+    assert repr(rows) == \
+        "[Participant(tid=5, token='ghi', attribute_1='a')]"
+    with pytest.raises(ValueError):
+        session.participant_rows(12, attributes=['attribute_2'])
+
+
+def test_participants_columns(connect):
+    session, stub = connect(reply(2, PARTICIPANTS),
+                            reply(3, {'status': 'Invalid session key'}))
+    assert session.participants_columns(12, attributes=['attribute_1']) == \
+        ({'tid': [3, 4], 'token': ['abc', 'def'],
+          'attribute_1': [None, None]}, None)
+    columns, error = session.participants_columns(12)
+    assert columns == {'tid': [], 'token': []}
+    assert error['code'] == -32099
+
+
+def test_surveys_cache(connect):
+    surveys = [{'sid': 12, 'surveyls_title': 'Survey'}]
+    session, stub = connect(reply(2, {'status': 'No surveys found'}),
+                            reply(3, surveys))
+    # statuses are not cached
+    assert session.surveys() == ({'status': 'No surveys found'}, None)
+    response, error = session.surveys()
+    assert response == surveys
+    # callers cannot alter the cache
+    response[0]['sid'] = 13
+    response.append({})
+    assert session.surveys() == (surveys, None)
+    assert len(stub.bodies) == 2
+    session.invalidate_surveys()
+    stub.replies.append(reply(4, surveys))
+    assert session.surveys() == (surveys, None)
+    assert len(stub.bodies) == 3
+
+
+class StubPooledSession(StubSession):
+
+    closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def test_pooled_session():
+    stub = StubPooledSession(reply(1, KEY), reply(1, KEY))
+    session_module._SESSION_POOL[URL] = stub
+    try:
+        first = lsrc2.Session(URL, 'user', 'password')
+        second = lsrc2.Session(URL, 'user', 'password')
+        assert first.session is second.session is stub
+        assert session_module._pooled_session(URL + '/') is not stub
+    finally:
+        lsrc2.close_sessions()
+    assert stub.closed
+    assert session_module._SESSION_POOL == {}
+
+
+def test_pooled_session_headers():
+    try:
+        session = session_module._pooled_session(URL)
+    finally:
+        lsrc2.close_sessions()
+    assert session.headers['content-type'] == 'application/json'
+    assert 'gzip' in session.headers['accept-encoding'].split(',')
+
+
+def test_pooled_session_adapter():
+    try:
+        session = session_module._pooled_session(URL)
+    finally:
+        lsrc2.close_sessions()
+    adapter = session.get_adapter(URL)
+    assert adapter._pool_connections == 1
+    assert adapter._pool_maxsize == 50
+    assert adapter.max_retries.total == 0
+    assert session.max_redirects == 0
+    assert session.cookies._policy.allowed_domains() == ()
+
+
+def test_release_session_key(connect):
+    session, stub = connect(reply(2, 'OK'))
+    assert session.key == KEY
+    with session:
+        pass
+    assert session.key is None
+    assert stub.bodies == [
+        b'{"jsonrpc":"2.0","id":2,"method":"release_session_key",'
+        b'"params":["k%d\\"x"]}',
+    ]
+    assert stub.responses[0].closed